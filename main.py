@@ -1,11 +1,79 @@
 import json
+import re
 import requests
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import random
+import gzip
+import hashlib
+import sqlite3
+import threading
+from collections import defaultdict, deque
+from itertools import takewhile
 from typing import Dict, Any, Tuple, Optional
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime
 
+try:
+    import ijson  # 可选依赖，用于流式解析大型JSON文件
+    _JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    _JSON_ERRORS = (json.JSONDecodeError,)
+
+try:
+    import orjson  # 可选依赖，更快的JSON编解码
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj, indent: bool = False) -> bytes:
+    """序列化为UTF-8编码的JSON，安装了orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
+
+
+def _json_loads(data):
+    """解析JSON文本或字节，安装了orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# 预编译的正则表达式
+_THINK_FULL = re.compile(r'<think>.*?</think>', re.DOTALL)
+_THINK_OPEN = re.compile(r'<think>.*', re.DOTALL)
+_THINK_CLOSE = re.compile(r'.*</think>', re.DOTALL)
+_WS = re.compile(r'\s+')
+_NUM_PREFIX = re.compile(r'^\[\d+\]\s*')
+# 批量提示词中换行符、制表符的转义表
+_ESCAPE_TABLE = str.maketrans({'\n': '\\n', '\t': '\\t'})
+# 批次失败后逐条重试时的并发数
+_FALLBACK_WORKERS = 8
+# 提示词中固定规则部分的token开销估计
+_PROMPT_OVERHEAD_TOKENS = 300
+# 翻译结果中表明模型出错或拒绝翻译的常见说法
+_ERROR_RE = re.compile(
+    r"translation failed|翻译失败|无法翻译|错误|sorry|i cannot|i can'?t|unable to|"
+    r"error occurred|something went wrong|出现错误|无法处理",
+    re.IGNORECASE
+)
+# 平假名、片假名、々、CJK汉字（含扩展A）及半角片假名
+_JP = re.compile(r'[\u3040-\u30FF\u3005\u3400-\u4DBF\u4E00-\u9FFF\uFF66-\uFF9F]')
+
+class _JitteredRetry(Retry):
+    """指数退避加全抖动的重试策略，首次重试同样随机等待，避免并发批次同时重试"""
+    
+    def get_backoff_time(self) -> float:
+        # 只统计最近一段连续的错误（忽略重定向），与urllib3一致
+        consecutive_errors = len(list(takewhile(lambda h: h.redirect_location is None, reversed(self.history))))
+        if consecutive_errors == 0:
+            return 0.0
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** (consecutive_errors - 1))))
+
+
 class JSONTranslator:
     def __init__(self, config_file: str = "translate_config.json"):
         """
@@ -17,6 +85,33 @@ class JSONTranslator:
         self.config = self.load_config(config_file)
         self.setup_logging()
         
+        # 根据API类型确定请求URL（请求头在会话中设置）
+        if self.config['api_type'] == 'google':
+            self._api_url = f"{self.config['api_endpoint']}?key={self.config['api_key']}"
+        else:
+            self._api_url = self.config['api_endpoint']
+        self.session = self.create_session()
+        self._prompt_prefix = self.build_prompt_prefix()
+        self.cache = sqlite3.connect(self.config['cache_file'], check_same_thread=False)
+        self.cache.execute('CREATE TABLE IF NOT EXISTS cache (hash BLOB PRIMARY KEY, value TEXT)')
+        self.cache_lock = threading.Lock()
+        self._progress_fh = None
+        self._progress_end = None  # 进度日志中最后一条可解析记录的结束位置
+        self._cur_batch = self.config['batch_size']
+        self._batch_outcomes = deque(maxlen=20)
+        self._batch_lock = threading.Lock()
+        
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """关闭HTTP会话和翻译缓存"""
+        self.session.close()
+        self.cache.close()
+    
     def load_config(self, config_file: str) -> Dict[str, Any]:
         """加载配置文件"""
         try:
@@ -31,11 +126,25 @@ class JSONTranslator:
             
             # 设置默认值
             config.setdefault('max_retries', 3)
-            config.setdefault('retry_delay', 5)
+            config.setdefault('retry_base_delay', 1.0)  # 指数退避的基础等待时间
+            config.setdefault('retry_max_delay', 30.0)  # 单次重试的最长等待时间
             config.setdefault('request_timeout', 60)  # 增加超时时间用于批量请求
             config.setdefault('batch_size', 50)  # 增加批量大小
+            config.setdefault('max_batch_size', config['batch_size'] * 2)  # 动态批次大小上限
+            config.setdefault('max_tokens', 4000)  # 单次请求的输出token上限
+            config.setdefault('model_context_limit', 8192)  # 模型上下文长度
+            config.setdefault('concurrency', 4)  # 同时进行的批次请求数
             config.setdefault('save_interval', 100)
             config.setdefault('api_type', 'openai')  # 默认为openai兼容API
+            config.setdefault('cache_file', 'translate_cache.sqlite')  # 跨运行复用的翻译缓存
+            config.setdefault('compress_requests', False)  # gzip压缩请求体，需API服务支持
+            
+            # 输出上限加上提示词开销必须小于上下文长度，否则所有批次都会被拆分到单条
+            if config['max_tokens'] + _PROMPT_OVERHEAD_TOKENS >= config['model_context_limit']:
+                raise ValueError(
+                    f"max_tokens ({config['max_tokens']}) 加提示词开销 ({_PROMPT_OVERHEAD_TOKENS}) "
+                    f"必须小于 model_context_limit ({config['model_context_limit']})"
+                )
             
             return config
         except FileNotFoundError:
@@ -55,12 +164,115 @@ class JSONTranslator:
         )
         self.logger = logging.getLogger(__name__)
     
-    def translate_batch(self, texts: list) -> dict:
+    def create_session(self) -> requests.Session:
+        """创建复用连接并带重试策略的HTTP会话，避免每个批次重新建立TCP/TLS连接"""
+        session = requests.Session()
+        # 指数退避加全抖动，避免并发批次同时重试；429时优先遵守Retry-After
+        retry = _JitteredRetry(
+            total=self.config['max_retries'],
+            backoff_factor=self.config['retry_base_delay'],
+            backoff_max=self.config['retry_max_delay'],
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=['POST'],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            # 在途请求最多为并发批次数加上逐条重试的并发数，连接池需全部容纳才能复用连接
+            pool_maxsize=max(32, self.config['concurrency'] + _FALLBACK_WORKERS),
+            max_retries=retry
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        
+        session.headers.update({'Content-Type': 'application/json'})
+        if self.config['api_type'] != 'google':
+            session.headers.update({'Authorization': f'Bearer {self.config["api_key"]}'})
+        
+        return session
+    
+    def cache_hash(self, value: str) -> bytes:
+        """计算缓存键，同一模型和语言对下相同原文共用一条缓存"""
+        source = f"{self.config['model']}|{self.config['source_language']}|{self.config['target_language']}|{value}"
+        return hashlib.blake2b(source.encode('utf-8'), digest_size=16).digest()
+    
+    def cache_lookup(self, hashes: list) -> Dict[bytes, str]:
+        """一次查询取出所有已缓存的翻译"""
+        if not hashes:
+            return {}
+        placeholders = ','.join('?' * len(hashes))
+        with self.cache_lock:
+            rows = self.cache.execute(f'SELECT hash, value FROM cache WHERE hash IN ({placeholders})', hashes).fetchall()
+        return dict(rows)
+    
+    def cache_store(self, entries: list):
+        """写入翻译缓存，entries格式为 [(hash, translated_text), ...]"""
+        if not entries:
+            return
+        with self.cache_lock:
+            self.cache.executemany('INSERT OR REPLACE INTO cache (hash, value) VALUES (?, ?)', entries)
+            self.cache.commit()
+    
+    def build_prompt_prefix(self) -> str:
+        """构建提示词中固定不变的规则部分，每个批次只需在其后拼接待处理文本"""
+        return """请按照以下规则批量处理文本：
+1. 如果文本包含日文（平假名、片假名、汉字），请翻译为中文
+2. 如果文本是纯英文、数字、符号或ID，请保持原样不变
+3. 必须保持原文中的所有格式，包括\\n换行符、空格、标点符号等
+4. 按照输入的序号顺序返回结果，每行一个结果
+5. 只返回处理后的结果，不要添加序号、解释或其他内容
+6. 如果原文包含\\n，翻译结果也必须在相应位置包含\\n
+7. 如果无法确定如何处理，请保持原文不变
+
+要处理的文本：
+"""
+    
+    def record_batch_outcome(self, success: bool):
+        """
+        根据请求结果调整批次大小 - 加性增大、乘性减小
+        
+        限流或结果行数不足时立即减半；成功时仅在最近的请求基本都成功时才增大，
+        避免在限额边缘来回抖动
+        
+        Args:
+            success: 本次请求是否完整返回
+        """
+        with self._batch_lock:
+            self._batch_outcomes.append(success)
+            if success:
+                if sum(self._batch_outcomes) >= 0.9 * len(self._batch_outcomes):
+                    self._cur_batch = min(self.config['max_batch_size'], self._cur_batch + 2)
+            else:
+                self._cur_batch = max(1, self._cur_batch // 2)
+                self.logger.info(f"批次大小调整为 {self._cur_batch}")
+    
+    def limit_batch_size(self, size: int):
+        """
+        批次因预估token超限被拆分时，把动态批次大小压到可容纳的条数以内
+        
+        同时记为一次失败，避免拆分后的子批次成功又把批次大小加回去
+        
+        Args:
+            size: 按预估token计算出的可容纳条数
+        """
+        with self._batch_lock:
+            self._batch_outcomes.append(False)
+            if size < self._cur_batch:
+                self._cur_batch = max(1, size)
+                self.logger.info(f"批次大小调整为 {self._cur_batch}")
+    
+    def estimate_tokens(self, texts: list) -> int:
+        """粗略估算批次文本的token数：日文约每2个字符1个token，另加序号等开销"""
+        return sum(len(value) // 2 + 8 for _, value in texts)
+    
+    def translate_batch(self, texts: list, check_cache: bool = True) -> dict:
         """
         批量翻译多个文本
         
         Args:
             texts: 要翻译的文本列表，格式为 [(key, value), ...]
+            check_cache: 是否先查缓存；拆分后的子批次已确认未命中，无需重复查询
             
         Returns:
             翻译结果字典 {key: translated_text}
@@ -68,37 +280,37 @@ class JSONTranslator:
         if not texts:
             return {}
         
-        # 根据API类型设置不同的请求头和URL
-        if self.config.get('api_type', 'openai') == 'google':
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            api_url = f"{self.config['api_endpoint']}?key={self.config['api_key']}"
-        else:
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {self.config["api_key"]}'
-            }
-            api_url = self.config['api_endpoint']
+        # 先查缓存，只把未命中的文本发送给API
+        hashes = {key: self.cache_hash(value) for key, value in texts}
+        cached_results = {}
+        if check_cache:
+            cached = self.cache_lookup(list(set(hashes.values())))
+            cached_results = {key: cached[h] for key, h in hashes.items() if h in cached}
+            texts = [(key, value) for key, value in texts if key not in cached_results]
+            if cached_results:
+                self.logger.info(f"缓存命中 {len(cached_results)} 条")
+            if not texts:
+                return cached_results
+        
+        # 预估token数，输出或上下文可能超限时拆成两半分别请求，避免结果被截断
+        estimated = self.estimate_tokens(texts)
+        input_budget = self.config['model_context_limit'] - self.config['max_tokens'] - _PROMPT_OVERHEAD_TOKENS
+        token_limit = min(self.config['max_tokens'], input_budget)
+        if len(texts) > 1 and estimated > token_limit:
+            self.limit_batch_size(token_limit * len(texts) // estimated)
+            mid = len(texts) // 2
+            self.logger.info(f"批次预估 {estimated} tokens，超出上限，拆分为 {mid} + {len(texts) - mid} 条")
+            first = self.translate_batch(texts[:mid], check_cache=False)
+            second = self.translate_batch(texts[mid:], check_cache=False)
+            if not first or not second:
+                return {}
+            return {**cached_results, **first, **second}
         
         # 构建批量翻译的提示词，使用特殊分隔符避免换行符混淆
-        batch_text = ""
-        for i, (key, value) in enumerate(texts):
-            # 将换行符转换为可见的标记，避免在批量处理时混淆
-            escaped_value = value.replace('\n', '\\n').replace('\t', '\\t')
-            batch_text += f"[{i+1}] {escaped_value}\n"
+        # 将换行符转换为可见的标记，避免在批量处理时混淆
+        batch_text = ''.join([f"[{i+1}] {value.translate(_ESCAPE_TABLE)}\n" for i, (key, value) in enumerate(texts)])
         
-        prompt = f"""请按照以下规则批量处理文本：
-1. 如果文本包含日文（平假名、片假名、汉字），请翻译为中文
-2. 如果文本是纯英文、数字、符号或ID，请保持原样不变
-3. 必须保持原文中的所有格式，包括\\n换行符、空格、标点符号等
-4. 按照输入的序号顺序返回结果，每行一个结果
-5. 只返回处理后的结果，不要添加序号、解释或其他内容
-6. 如果原文包含\\n，翻译结果也必须在相应位置包含\\n
-7. 如果无法确定如何处理，请保持原文不变
-
-要处理的文本：
-{batch_text}"""
+        prompt = self._prompt_prefix + batch_text
         
         data = {
             'model': self.config['model'],
@@ -108,77 +320,87 @@ class JSONTranslator:
                     'content': prompt
                 }
             ],
-            'max_tokens': 4000,  # 增加token限制用于批量翻译
+            'max_tokens': self.config['max_tokens'],
             'temperature': 0.3
         }
         
-        for attempt in range(self.config['max_retries']):
-            try:
-                response = requests.post(
-                    api_url,
-                    headers=headers,
-                    json=data,
-                    timeout=self.config['request_timeout']
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'choices' in result and len(result['choices']) > 0:
-                        translation_text = result['choices'][0]['message']['content'].strip()
-                        
-                        # 解析批量翻译结果
-                        translated_results = {}
-                        translation_lines = translation_text.split('\n')
-                        
-                        for i, (key, original_value) in enumerate(texts):
-                            if i < len(translation_lines):
-                                translated_line = translation_lines[i].strip()
-                                # 移除可能的序号前缀
-                                import re
-                                translated_line = re.sub(r'^\[\d+\]\s*', '', translated_line)
-                                # 恢复换行符和制表符
-                                translated_line = translated_line.replace('\\n', '\n').replace('\\t', '\t')
+        # 较大的请求体按需gzip压缩（响应的gzip解压由requests自动处理）
+        body = _json_dumps(data)
+        headers = {}
+        if self.config['compress_requests'] and len(body) >= 1024:
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        
+        # 重试（限流、5xx、连接错误）由会话上挂载的urllib3 Retry统一处理
+        try:
+            response = self.session.post(
+                self._api_url,
+                data=body,
+                headers=headers,
+                timeout=self.config['request_timeout']
+            )
+            
+            # 重试过程中遇到过限流时缩小批次
+            retries = getattr(response.raw, 'retries', None)
+            if retries is not None and any(h.status == 429 for h in retries.history):
+                self.record_batch_outcome(False)
+            
+            if response.status_code == 200:
+                result = _json_loads(response.content)
+                if 'choices' in result and len(result['choices']) > 0:
+                    translation_text = result['choices'][0]['message']['content'].strip()
+                    
+                    # 解析批量翻译结果
+                    translated_results = dict(cached_results)
+                    cache_entries = []
+                    translation_lines = translation_text.split('\n')
+                    self.record_batch_outcome(len(translation_lines) >= len(texts))
+                    
+                    for i, (key, original_value) in enumerate(texts):
+                        if i < len(translation_lines):
+                            translated_line = translation_lines[i].strip()
+                            # 移除可能的序号前缀
+                            translated_line = _NUM_PREFIX.sub('', translated_line)
+                            # 恢复换行符和制表符
+                            translated_line = translated_line.replace('\\n', '\n').replace('\\t', '\t')
                                 
-                                if self.is_valid_translation(original_value, translated_line):
-                                    translated_results[key] = translated_line
-                                    self.logger.info(f"批量翻译成功: {original_value[:20]}... -> {translated_line[:20]}...")
-                                else:
-                                    translated_results[key] = original_value
-                                    self.logger.warning(f"批量翻译结果无效，保留原文: {original_value[:20]}...")
+                            if self.is_valid_translation(original_value, translated_line):
+                                translated_results[key] = translated_line
+                                cache_entries.append((hashes[key], translated_line))
+                                self.logger.info(f"批量翻译成功: {original_value[:20]}... -> {translated_line[:20]}...")
                             else:
-                                # 如果翻译结果行数不够，保留原文
                                 translated_results[key] = original_value
-                                self.logger.warning(f"批量翻译结果行数不足，保留原文: {key}")
-                        
-                        return translated_results
-                    else:
-                        self.logger.error(f"API响应格式错误: {result}")
-                        
-                elif response.status_code == 429:  # 达到限额
-                    self.logger.warning(f"API限额达到，等待 {self.config['retry_delay']} 秒后重试...")
-                    time.sleep(self.config['retry_delay'])
-                    
-                elif response.status_code == 401:  # API密钥错误
-                    self.logger.error("API密钥错误，请检查配置")
-                    return {}
+                                self.logger.warning(f"批量翻译结果无效，保留原文: {original_value[:20]}...")
+                        else:
+                            # 如果翻译结果行数不够，保留原文
+                            translated_results[key] = original_value
+                            self.logger.warning(f"批量翻译结果行数不足，保留原文: {key}")
                     
+                    # 行数不一致时模型可能合并或遗漏了某行，后续译文会错位，不写入缓存
+                    if len(translation_lines) == len(texts):
+                        self.cache_store(cache_entries)
+                    return translated_results
                 else:
-                    self.logger.error(f"批量翻译API请求失败，状态码: {response.status_code}, 响应: {response.text}")
+                    self.logger.error(f"API响应格式错误: {result}")
                     
-            except requests.exceptions.Timeout:
-                self.logger.warning(f"批量翻译请求超时，第 {attempt + 1} 次尝试...")
+            elif response.status_code == 429:  # 达到限额（批次大小已根据重试记录调整）
+                self.logger.warning("API限额达到，重试次数已用完")
                 
-            except requests.exceptions.ConnectionError:
-                self.logger.warning(f"批量翻译连接失败，第 {attempt + 1} 次尝试...")
+            elif response.status_code == 401:  # API密钥错误
+                self.logger.error("API密钥错误，请检查配置")
+                return {}
                 
-            except Exception as e:
-                self.logger.error(f"批量翻译过程中出现错误: {str(e)}")
+            else:
+                self.logger.error(f"批量翻译API请求失败，状态码: {response.status_code}, 响应: {response.text}")
                 
-            if attempt < self.config['max_retries'] - 1:
-                time.sleep(self.config['retry_delay'])
+        except requests.RequestException as e:
+            self.logger.warning(f"批量翻译请求失败，重试次数已用完: {str(e)}")
+            
+        except Exception as e:
+            self.logger.error(f"批量翻译过程中出现错误: {str(e)}")
         
-        # 如果批量翻译失败，返回原文
-        return {key: value for key, value in texts}
+        # 如果批量翻译失败，未命中缓存的部分返回原文
+        return {**cached_results, **{key: value for key, value in texts}}
     
     def clean_translation_result(self, text: str) -> str:
         """
@@ -190,12 +412,10 @@ class JSONTranslator:
         Returns:
             清理后的翻译结果
         """
-        import re
-        
         # 移除 <think> 标签及其内容（包括不完整的标签）
-        text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
-        text = re.sub(r'<think>.*', '', text, flags=re.DOTALL)  # 移除不完整的开始标签
-        text = re.sub(r'.*</think>', '', text, flags=re.DOTALL)  # 移除不完整的结束标签
+        text = _THINK_FULL.sub('', text)
+        text = _THINK_OPEN.sub('', text)  # 移除不完整的开始标签
+        text = _THINK_CLOSE.sub('', text)  # 移除不完整的结束标签
         
         # # 移除常见的无关内容和残留片段
         # unwanted_patterns = [
@@ -213,7 +433,7 @@ class JSONTranslator:
         # text = re.sub(r'\bnk\b', '', text, flags=re.IGNORECASE)
         
         # 清理多余的空白字符和换行
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WS.sub(' ', text).strip()
         
         return text
     
@@ -228,60 +448,99 @@ class JSONTranslator:
         Returns:
             翻译是否有效
         """
-        if not translation or not translation.strip():
-            print(f"翻译结果为空或仅包含空白字符")
-            return False
-        
-        # 去除空白字符进行比较
-        original_clean = original.strip()
         translation_clean = translation.strip()
+        if not translation_clean:
+            self.logger.debug("翻译结果为空或仅包含空白字符")
+            return False
         
         # 检查翻译结果是否包含明显的错误信息
-        error_patterns = [
-            'translation failed', '翻译失败', '无法翻译', '错误', 
-            'sorry', 'i cannot', 'i can\'t', 'unable to', 'error occurred',
-            'something went wrong', '出现错误', '无法处理'
-        ]
-        
-        translation_lower = translation_clean.lower()
-        for pattern in error_patterns:
-            if pattern in translation_lower:
-                print(f"翻译结果包含错误信息")
-                return False
+        if _ERROR_RE.search(translation_clean):
+            self.logger.debug("翻译结果包含错误信息")
+            return False
         
         # 检查翻译结果长度是否过长（可能是错误或包含解释）
-        if len(translation_clean) > len(original_clean) * 5:  # 允许更大的长度差异
-            print(f"翻译结果长度异常")
+        if len(translation_clean) > len(original.strip()) * 5:  # 允许更大的长度差异
+            self.logger.debug("翻译结果长度异常")
             return False
         
         # 其他情况都认为是有效的
         return True
     
-    def save_progress(self, translated_data: Dict[str, str], progress_file: str):
-        """保存翻译进度"""
+    def open_progress(self, progress_file: str):
+        """以追加模式打开进度日志，截掉加载时未能解析的尾部，并保证后续记录从新行开始"""
+        self._progress_fh = open(progress_file, 'ab+')
+        end = self._progress_fh.seek(0, os.SEEK_END)
+        if self._progress_end is not None and self._progress_end < end:
+            self._progress_fh.truncate(self._progress_end)
+            end = self._progress_end
+        
+        # 最后一条完整记录可能缺少换行符，补上后再追加
+        if end:
+            self._progress_fh.seek(end - 1)
+            if self._progress_fh.read(1) != b'\n':
+                self._progress_fh.write(b'\n')
+    
+    def close_progress(self):
+        """关闭进度日志"""
+        if self._progress_fh:
+            self._progress_fh.close()
+            self._progress_fh = None
+    
+    def save_progress(self, entries: Dict[str, str]):
+        """追加保存自上次保存以来新增的翻译记录，每条记录一行"""
         try:
-            with open(progress_file, 'w', encoding='utf-8') as f:
-                json.dump(translated_data, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"翻译进度已保存到: {progress_file}")
+            self._progress_fh.write(b''.join([_json_dumps({key: value}) + b'\n' for key, value in entries.items()]))
+            self._progress_fh.flush()
+            self.logger.info(f"翻译进度已保存到: {self._progress_fh.name}")
         except Exception as e:
             self.logger.error(f"保存进度失败: {str(e)}")
     
     def load_progress(self, progress_file: str) -> Dict[str, str]:
-        """加载翻译进度"""
+        """加载翻译进度，并记录最后一条可解析记录的结束位置供追加前截断"""
+        data = {}
+        self._progress_end = 0
         if os.path.exists(progress_file):
             try:
-                with open(progress_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                position = 0
+                with open(progress_file, 'rb') as f:
+                    for line in f:
+                        position += len(line)
+                        try:
+                            data.update(_json_loads(line))
+                            self._progress_end = position
+                        except (json.JSONDecodeError, UnicodeDecodeError):
+                            # 中断时可能留下不完整的最后一行
+                            self.logger.warning(f"跳过损坏的进度记录: {line[:50].decode('utf-8', errors='replace')}")
                 self.logger.info(f"从 {progress_file} 加载了 {len(data)} 条翻译记录")
-                return data
             except Exception as e:
                 self.logger.error(f"加载进度失败: {str(e)}")
+                # 读取失败时不截断原文件
+                self._progress_end = None
                 return {}
-        return {}
+        return data
+    
+    def iter_source_items(self, input_file: str):
+        """
+        逐条读取原文 - 安装了ijson时流式解析，避免整个文件同时驻留内存
+        
+        Args:
+            input_file: 输入文件路径
+            
+        Returns:
+            (key, value) 迭代器
+        """
+        if ijson is not None:
+            with open(input_file, 'rb') as f:
+                yield from ijson.kvitems(f, '')
+        else:
+            with open(input_file, 'rb') as f:
+                yield from _json_loads(f.read()).items()
     
     def should_translate(self, key: str, value: str) -> bool:
         """
-        判断是否需要翻译 - 现在对所有非空文本都进行处理
+        判断是否需要翻译 - 只处理包含日文字符的文本
+        
+        纯英文、数字、符号或ID无需请求API，直接保留原文
         
         Args:
             key: JSON键
@@ -290,12 +549,12 @@ class JSONTranslator:
         Returns:
             是否需要翻译
         """
-        # 只跳过空字符串
+        # 跳过空字符串
         if not value or not value.strip():
             return False
-            
-        # 对所有其他文本都进行处理，让AI来判断是否需要翻译
-        return True
+        
+        # 不含假名或汉字的文本保持原样
+        return _JP.search(value) is not None
     
     def translate_json_file(self, 
                           input_file: str, 
@@ -313,27 +572,24 @@ class JSONTranslator:
             翻译是否成功完成
         """
         if not progress_file:
-            progress_file = f"{input_file}.progress.json"
+            progress_file = f"{input_file}.progress.jsonl"
+        
+        # 自上次保存以来新增、尚未写入进度文件的记录
+        pending = {}
         
         try:
-            # 加载原始数据
-            with open(input_file, 'r', encoding='utf-8') as f:
-                original_data = json.load(f)
-            
-            self.logger.info(f"加载了 {len(original_data)} 条记录")
-            
             # 加载进度（如果存在）
             translated_data = self.load_progress(progress_file)
-            
-            # 统计信息
-            total_items = len(original_data)
             completed_items = len(translated_data)
             
-            self.logger.info(f"总计: {total_items} 条，已完成: {completed_items} 条")
-            
-            # 收集需要翻译的项目
-            items_to_translate = []
-            for key, value in original_data.items():
+            # 逐条读取原始数据，收集需要翻译的项目
+            # 相同原文只翻译一次，翻译后再分发到所有对应的键
+            unique = defaultdict(list)
+            total_items = 0
+            pending_items = 0
+            for key, value in self.iter_source_items(input_file):
+                total_items += 1
+                
                 # 跳过已翻译的项目
                 if key in translated_data:
                     continue
@@ -343,66 +599,96 @@ class JSONTranslator:
                     translated_data[key] = value
                     continue
                 
-                items_to_translate.append((key, value))
+                unique[value].append(key)
+                pending_items += 1
+            unique_items = [(value, value) for value in unique]
             
-            self.logger.info(f"需要翻译的项目: {len(items_to_translate)} 条")
+            # 原文读取成功后再打开进度日志，避免输入文件有误时留下空的进度文件
+            self.open_progress(progress_file)
             
-            # 批量翻译
-            batch_size = self.config['batch_size']
+            self.logger.info(f"加载了 {total_items} 条记录")
+            self.logger.info(f"总计: {total_items} 条，已完成: {completed_items} 条")
+            self.logger.info(f"需要翻译的项目: {pending_items} 条，去重后 {len(unique_items)} 条")
+            
+            # 并发批量翻译，每个批次按当前动态批次大小切分
+            concurrency = self.config['concurrency']
+            position = 0
+            completed_batches = 0
             failed_batches = 0
             
-            for i in range(0, len(items_to_translate), batch_size):
-                batch = items_to_translate[i:i + batch_size]
-                self.logger.info(f"正在处理批次 {i//batch_size + 1}/{(len(items_to_translate) + batch_size - 1)//batch_size}，包含 {len(batch)} 个项目")
-                
-                # 批量翻译这一批次
-                batch_results = self.translate_batch(batch)
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {}
                 
-                if batch_results:
-                    # 更新翻译结果
-                    translated_data.update(batch_results)
-                    failed_batches = 0  # 重置失败计数
-                    self.logger.info(f"批次翻译成功，已完成 {len(translated_data)}/{total_items} 条记录")
-                else:
-                    # 批量翻译失败，尝试更小的批次
-                    self.logger.warning("批量翻译失败，尝试更小的批次")
-                    failed_batches += 1
+                while position < len(unique_items) or futures:
+                    # 补充在途批次
+                    while position < len(unique_items) and len(futures) < concurrency:
+                        batch = unique_items[position:position + self._cur_batch]
+                        position += len(batch)
+                        futures[executor.submit(self.translate_batch, batch)] = batch
                     
-                    # 将批次拆分为更小的单位重试
-                    for key, value in batch:
-                        # 即使是单个元素也使用批量翻译接口
-                        single_batch_result = self.translate_batch([(key, value)])
-                        if single_batch_result and key in single_batch_result:
-                            translated_data[key] = single_batch_result[key]
-                            self.logger.info(f"单元素批量翻译成功: {key}")
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch = futures.pop(future)
+                        batch_results = future.result()
+                        completed_batches += 1
+                        self.logger.info(f"批次 {completed_batches} 已返回，包含 {len(batch)} 个项目，剩余 {len(unique_items) - position} 个待发送")
+                        
+                        new_entries = {}
+                        if batch_results:
+                            # 更新翻译结果
+                            for value, translation in batch_results.items():
+                                for key in unique[value]:
+                                    new_entries[key] = translation
+                            translated_data.update(new_entries)
+                            failed_batches = 0  # 重置失败计数
+                            self.logger.info(f"批次翻译成功，已完成 {len(translated_data)}/{total_items} 条记录")
                         else:
-                            # 翻译失败，保留原文
-                            translated_data[key] = value
-                            self.logger.error(f"翻译失败，保留原文: {key}")
+                            # 批量翻译失败，尝试更小的批次
+                            self.logger.warning("批量翻译失败，尝试更小的批次")
+                            failed_batches += 1
+                            
+                            # 将批次拆分为单个元素并发重试，请求节奏由会话的重试退避控制
+                            with ThreadPoolExecutor(max_workers=min(_FALLBACK_WORKERS, len(batch))) as single_executor:
+                                # 即使是单个元素也使用批量翻译接口
+                                single_futures = {
+                                    single_executor.submit(self.translate_batch, [(value, value)]): value
+                                    for value, _ in batch
+                                }
+                                for single_future in as_completed(single_futures):
+                                    value = single_futures[single_future]
+                                    single_batch_result = single_future.result()
+                                    if single_batch_result and value in single_batch_result:
+                                        translation = single_batch_result[value]
+                                        self.logger.info(f"单元素批量翻译成功: {value[:20]}")
+                                    else:
+                                        # 翻译失败，保留原文
+                                        translation = value
+                                        self.logger.error(f"翻译失败，保留原文: {value[:20]}")
+                                    for key in unique[value]:
+                                        new_entries[key] = translation
+                                        translated_data[key] = translation
                         
-                        # 避免请求过快
-                        time.sleep(0.5)
-                    
-                    # 如果连续多个批次失败，可能是API问题
-                    if failed_batches >= 5:
-                        self.logger.error("连续批量翻译失败次数过多，保存当前进度并停止")
-                        self.save_progress(translated_data, progress_file)
-                        return False
-                
-                # 定期保存进度
-                if (i // batch_size + 1) % (self.config['save_interval'] // batch_size + 1) == 0:
-                    self.save_progress(translated_data, progress_file)
-                
-                # 避免请求过快，批量翻译间隔稍长
-                time.sleep(1.0)
+                        pending.update(new_entries)
+                        
+                        # 如果连续多个批次失败，可能是API问题
+                        if failed_batches >= 5:
+                            self.logger.error("连续批量翻译失败次数过多，保存当前进度并停止")
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            return False
+                        
+                        # 定期保存进度
+                        if len(pending) >= self.config['save_interval']:
+                            self.save_progress(pending)
+                            pending.clear()
             
             # 保存最终结果
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(translated_data, f, ensure_ascii=False, indent=2)
+            with open(output_file, 'wb') as f:
+                f.write(_json_dumps(translated_data, indent=True))
             
             self.logger.info(f"翻译完成！结果已保存到: {output_file}")
             
             # 删除进度文件
+            self.close_progress()
             if os.path.exists(progress_file):
                 os.remove(progress_file)
                 self.logger.info("进度文件已删除")
@@ -412,12 +698,17 @@ class JSONTranslator:
         except FileNotFoundError:
             self.logger.error(f"输入文件不存在: {input_file}")
             return False
-        except json.JSONDecodeError:
+        except _JSON_ERRORS:
             self.logger.error(f"输入文件格式错误: {input_file}")
             return False
         except Exception as e:
             self.logger.error(f"翻译过程中出现错误: {str(e)}")
             return False
+        finally:
+            # 中断或出错时保存剩余进度；正常完成时进度文件已关闭并删除
+            if pending and self._progress_fh:
+                self.save_progress(pending)
+            self.close_progress()
 
 def main():
     """主函数"""
@@ -434,7 +725,7 @@ def main():
     # 设置文件路径
     input_file = "ManualTransFile.json"
     output_file = f"translated_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    progress_file = "translation_progress.json"
+    progress_file = "translation_progress.jsonl"
     
     print(f"输入文件: {input_file}")
     print(f"输出文件: {output_file}")
@@ -449,7 +740,8 @@ def main():
             print("已删除进度文件，将重新开始翻译")
     
     print("开始翻译...")
-    success = translator.translate_json_file(input_file, output_file, progress_file)
+    with translator:
+        success = translator.translate_json_file(input_file, output_file, progress_file)
     
     if success:
         print("翻译成功完成！")